@@ -1,25 +1,59 @@
 import os
+
+# TensorFlow reads these at import time, so set them before importing it
+os.environ.setdefault("TF_FORCE_GPU_ALLOW_GROWTH", "true")
+# Inference runs on tiny (batch, MAX_SEQ_LEN) inputs, where a thread per core
+# only adds sync overhead; keep the TF and OpenMP pools small
+TF_INTRA_OP_THREADS = int(os.environ.get("TF_INTRA_OP_THREADS", 2))
+TF_INTER_OP_THREADS = int(os.environ.get("TF_INTER_OP_THREADS", 1))
+os.environ.setdefault("OMP_NUM_THREADS", str(TF_INTRA_OP_THREADS))
+os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(TF_INTRA_OP_THREADS))
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", str(TF_INTER_OP_THREADS))
+# oneDNN fused kernels (LSTM, matmul+bias) on CPU
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "1")
+# XLA on CPU for the inference graph (TF_JIT_COMPILE=0 disables it)
+TF_JIT_COMPILE = os.environ.get("TF_JIT_COMPILE", "1") == "1"
+if TF_JIT_COMPILE:
+    os.environ.setdefault("TF_XLA_FLAGS", "--tf_xla_auto_jit=2 --tf_xla_cpu_global_jit")
+
+import sys
 import json
+import gzip
+import asyncio
 import logging
 import pickle
+import hashlib
+import threading
+import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, namedtuple
 import numpy as np
 import tensorflow as tf
-import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 from tensorflow.keras.models import model_from_json
+from tensorflow.keras.preprocessing.text import tokenizer_from_json
 import spacy
-from spacy.matcher import PhraseMatcher
+import ahocorasick
+from text_encoding import SequenceEncoder
+from artifact_lock import artifact_lock, read_model_stamp
 from fastapi import FastAPI, HTTPException, BackgroundTasks, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import subprocess
+from typing import List
 import fitz
 
+tf.config.threading.set_intra_op_parallelism_threads(TF_INTRA_OP_THREADS)
+tf.config.threading.set_inter_op_parallelism_threads(TF_INTER_OP_THREADS)
+
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # FastAPI initialization
-app = FastAPI(title="TextIntel API")
+# orjson serializes responses in C instead of the stdlib json encoder
+app = FastAPI(title="TextIntel API", default_response_class=ORJSONResponse)
 
 # Enable CORS for local development
 origins = ["http://127.0.0.1:5173", "http://localhost:5173", "http://localhost:5174"]
@@ -36,27 +70,86 @@ app.add_middleware(
 MODEL_JSON_PATH = os.environ.get("MODEL_JSON", "sentiment.json")
 MODEL_WEIGHTS_PATH = os.environ.get("MODEL_WEIGHTS", "sentiment.weights.h5")
 TOKENIZER_PATH = os.environ.get("TOKENIZER", "tokenizer.pkl")
+# Gzipped Keras JSON tokenizer written by retrain_model.py
+TOKENIZER_JSON_PATH = os.environ.get("TOKENIZER_JSON", "tokenizer.json.gz")
+# Compact vocabulary written by retrain_model.py; the tokenizer files are only
+# read when it is missing
+VOCAB_PATH = os.environ.get("VOCAB", "vocab.npz")
+MODEL_TFLITE_PATH = os.environ.get("MODEL_TFLITE", "sentiment.tflite")
+MODEL_ONNX_PATH = os.environ.get("MODEL_ONNX", "sentiment.onnx")
+MODEL_ONNX_INT8_PATH = os.environ.get("MODEL_ONNX_INT8", "sentiment.int8.onnx")
+# keras | tflite | onnx | onnx_int8, or auto: the first exported artifact
+# found (onnx_int8, onnx, tflite) that is not older than the Keras model, else keras
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "auto")
 SPACY_MODEL = os.environ.get("SPACY_MODEL", "en_core_web_md")
+# Comma-separated spaCy components that /ner does not need (never loaded)
+SPACY_EXCLUDED_PIPES = [
+    p for p in os.environ.get("SPACY_EXCLUDED_PIPES", "tagger,parser,lemmatizer,attribute_ruler").split(",") if p
+]
 MAX_SEQ_LEN = int(os.environ.get("MAX_SEQ_LEN", 100))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 32))
+MAX_BATCH_LATENCY = int(os.environ.get("MAX_BATCH_LATENCY_MS", 10)) / 1000
+MAX_ALLOWED_BATCH = int(os.environ.get("MAX_ALLOWED_BATCH", 256))
+CLASSIFY_CACHE_SIZE = int(os.environ.get("CLASSIFY_CACHE_SIZE", 4096))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+# How often each worker checks the model stamp for a retrain done by any worker
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", 5))
+METRICS_PATH = "model_metrics.json"
 
 # Globals for model and tokenizer
 model = None
-tokenizer = None
-nlp = spacy.load(SPACY_MODEL)
+# Keras architecture JSON and predict function of the currently loaded model
+keras_model_json = None
+keras_predict_fn = None
+
+# Bounded LRU of classification results, shared by the event loop and worker threads
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
 
-# Rule-based weapon matcher
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+# Everything a classification needs from one load, published as a single
+# immutable object so readers never combine parts of two different loads
+ModelState = namedtuple("ModelState", ["encoder", "encoder_source", "predict_fn", "cache", "stamp"])
+model_state = None
+
+# Micro-batching queue for /classify, created on startup inside the running loop
+classify_queue = None
+batch_worker_task = None
+reload_watcher_task = None
+# Model calls run on one dedicated thread: the backends parallelize internally,
+# and it keeps inference from competing with PDF parsing in the default pool
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+# Only tok2vec + ner are needed for entity extraction. Excluded components are
+# not loaded at all (disabled ones would still sit in memory). The word vectors
+# stay: the md/lg NER models use them as input features.
+nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDED_PIPES)
+
+# Weapon keywords for rule-based matching
 weapon_list = [
     "AK-47", "grenade", "RPG-7", "missile", "sniper rifle", "pistol", 
     "bomb", "mortar", "machine gun", "gun", "rifle", "ammunition", 
     "explosive", "IED", "rocket", "launcher", "knife", "weapon",
     "attack", "assault", "strike", "raid", "ambush"
 ]
-matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-patterns = [nlp.make_doc(w) for w in weapon_list]
-matcher.add("WEAPON", patterns)
 
 # Expanded categories for better entity extraction
-CATEGORIES = [
+CATEGORIES = frozenset({
     "PERSON",      # People, names
     "GPE",         # Countries, cities, states
     "ORG",         # Organizations, companies, agencies
@@ -70,7 +163,7 @@ CATEGORIES = [
     "QUANTITY",    # Measurements, quantities
     "CARDINAL",    # Numbers
     "ORDINAL"      # First, second, etc.
-]
+})
 
 # Location/military keywords for pattern matching
 military_keywords = [
@@ -78,27 +171,244 @@ military_keywords = [
     "position", "coordinates", "target", "objective", "zone", "sector",
     "command", "post", "station", "facility", "compound", "bunker"
 ]
-military_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-military_patterns = [nlp.make_doc(k) for k in military_keywords]
-military_matcher.add("MILITARY", military_patterns)
 
-# Reload model/tokenizer function
-def load_model_and_tokenizer():
-    global model, tokenizer
-    with open(TOKENIZER_PATH, "rb") as f:
-        tokenizer = pickle.load(f)
+# Rule-based labels and their keyword lists, in output order
+RULE_PATTERNS = {
+    "WEAPON": weapon_list,
+    "MILITARY": military_keywords,
+}
+
+# Rule-based matcher: a single Aho-Corasick automaton finds every rule label's
+# keywords in one pass over the lowercased text
+def build_rule_automaton():
+    automaton = ahocorasick.Automaton()
+    for label, terms in RULE_PATTERNS.items():
+        for term in terms:
+            key = term.lower()
+            automaton.add_word(key, (label, len(key)))
+    automaton.make_automaton()
+    return automaton
+
+rule_automaton = build_rule_automaton()
+
+def match_rules(text: str):
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Some characters change length when lowercased; slice the lowered text instead
+        text = lowered
+    hits = {label: [] for label in RULE_PATTERNS}
+    for end, (label, length) in rule_automaton.iter(lowered):
+        start = end - length + 1
+        # Only accept whole-word hits, as the token-based PhraseMatcher did
+        if start > 0 and lowered[start - 1].isalnum():
+            continue
+        if end + 1 < len(lowered) and lowered[end + 1].isalnum():
+            continue
+        hits[label].append((text[start:end + 1], label))
+    return [hit for label_hits in hits.values() for hit in label_hits]
+
+# Keras model: returns a predict function backed by a traced concrete function,
+# plus the weight load to run on the inference thread when the model is reused
+def load_keras_model():
+    global model, keras_model_json, keras_predict_fn
     with open(MODEL_JSON_PATH, "r") as jf:
         model_json = jf.read()
+    if keras_predict_fn is not None and model_json == keras_model_json:
+        # Same architecture: load the new weights into the existing variables,
+        # which keeps the traced (and XLA-compiled) function valid. Those
+        # variables may be serving requests, so the load is handed back to run
+        # between batches rather than done here.
+        live_model = model
+        return keras_predict_fn, lambda: live_model.load_weights(MODEL_WEIGHTS_PATH)
     loaded_model = model_from_json(model_json)
     loaded_model.load_weights(MODEL_WEIGHTS_PATH)
     loaded_model.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
     model = loaded_model
+    # Call the model directly inside a traced graph rather than through the
+    # Keras predict() loop; any batch size reuses the same trace. XLA fuses the
+    # embedding/LSTM/dense ops for the fixed MAX_SEQ_LEN shape.
+    @tf.function(
+        input_signature=[tf.TensorSpec((None, MAX_SEQ_LEN), tf.int32)],
+        jit_compile=TF_JIT_COMPILE,
+    )
+    def _predict(x):
+        return loaded_model(x, training=False)
+
+    def predict(padded):
+        return _predict(tf.constant(padded, dtype=tf.int32)).numpy()
+    keras_model_json, keras_predict_fn = model_json, predict
+    return predict, None
+
+# Quantized TFLite model (see export_model.py): returns a predict function
+def load_tflite_model():
+    interpreter = tf.lite.Interpreter(model_path=MODEL_TFLITE_PATH, num_threads=TF_INTRA_OP_THREADS)
+    interpreter.allocate_tensors()
+    input_detail = interpreter.get_input_details()[0]
+    input_index = input_detail["index"]
+    input_dtype = input_detail["dtype"]
+    output_index = interpreter.get_output_details()[0]["index"]
+    # The interpreter owns its tensor buffers, so invocations must not overlap
+    lock = threading.Lock()
+
+    def predict(padded):
+        with lock:
+            if tuple(interpreter.get_input_details()[0]["shape"]) != padded.shape:
+                interpreter.resize_tensor_input(input_index, padded.shape)
+                interpreter.allocate_tensors()
+            interpreter.set_tensor(input_index, padded.astype(input_dtype))
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index)
+    return predict
+
+# ONNX Runtime model (see export_model.py): returns a predict function.
+# InferenceSession.run is thread-safe, so no lock is needed. onnxruntime is
+# optional: it is only imported when an ONNX backend is selected.
+def load_onnx_model(path=MODEL_ONNX_PATH):
+    import onnxruntime as ort
+    so = ort.SessionOptions()
+    so.intra_op_num_threads = TF_INTRA_OP_THREADS
+    so.inter_op_num_threads = TF_INTER_OP_THREADS
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess = ort.InferenceSession(path, sess_options=so, providers=["CPUExecutionProvider"])
+    input_name = sess.get_inputs()[0].name
+
+    def predict(padded):
+        return sess.run(None, {input_name: padded.astype(np.int32)})[0]
+    return predict
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+# A derived artifact (export, compact vocabulary) is only used when it exists
+# and is at least as new as every existing file it was derived from
+def is_fresh(path, *sources):
+    mtime = file_mtime(path)
+    if mtime is None:
+        return False
+    return all(mtime >= source_mtime for source_mtime in map(file_mtime, sources) if source_mtime is not None)
+
+# Returns (predict, apply): apply is None, or an update to the live model that
+# must run on the inference thread before the new state is published
+def load_inference_backend():
+    backend = INFERENCE_BACKEND
+    if backend == "auto":
+        # Exports left over from an earlier API retrain must not shadow a
+        # model written since (e.g. by classify.ipynb)
+        model_files = (MODEL_JSON_PATH, MODEL_WEIGHTS_PATH)
+        has_onnxruntime = importlib.util.find_spec("onnxruntime") is not None
+        if has_onnxruntime and is_fresh(MODEL_ONNX_INT8_PATH, *model_files):
+            backend = "onnx_int8"
+        elif has_onnxruntime and is_fresh(MODEL_ONNX_PATH, *model_files):
+            backend = "onnx"
+        elif is_fresh(MODEL_TFLITE_PATH, *model_files):
+            backend = "tflite"
+        else:
+            backend = "keras"
+    loaders = {
+        "keras": load_keras_model,
+        "tflite": lambda: (load_tflite_model(), None),
+        "onnx": lambda: (load_onnx_model(), None),
+        "onnx_int8": lambda: (load_onnx_model(MODEL_ONNX_INT8_PATH), None),
+    }
+    logger.info("Using %s inference backend", backend)
+    return loaders[backend]()
+
+# XLA compiles (and TFLite reallocates) once per input shape, so batches are
+# padded with empty rows up to a power of two to keep the set of shapes small
+def batch_bucket(n: int):
+    return 1 << (n - 1).bit_length()
+
+WARMUP_BUCKETS = [1 << i for i in range(batch_bucket(MAX_BATCH_SIZE).bit_length())]
+
+# Padding buffer reused by the /classify batch worker. Only that worker uses
+# it, and it runs one batch at a time, so it is never written concurrently.
+batch_pad_buf = np.zeros((WARMUP_BUCKETS[-1], MAX_SEQ_LEN), dtype=np.int32)
+
+# Encoder for the current vocabulary file; only re-read (and rebuilt) when the
+# file changed. vocab.npz is used while it is not older than either tokenizer
+# file; otherwise the newest tokenizer wins (retraining writes the JSON one,
+# classify.ipynb the pickle).
+def load_encoder():
+    tokenizers = [p for p in (TOKENIZER_JSON_PATH, TOKENIZER_PATH) if os.path.exists(p)]
+    if is_fresh(VOCAB_PATH, *tokenizers):
+        path = VOCAB_PATH
+    else:
+        path = max(tokenizers, key=os.path.getmtime, default=TOKENIZER_PATH)
+    source = (path, os.path.getmtime(path))
+    if model_state is not None and source == model_state.encoder_source:
+        return model_state.encoder, source
+    if path == VOCAB_PATH:
+        return SequenceEncoder.from_vocab(path, MAX_SEQ_LEN), source
+    if path == TOKENIZER_JSON_PATH:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return SequenceEncoder(tokenizer_from_json(f.read()), MAX_SEQ_LEN), source
+    with open(path, "rb") as f:
+        return SequenceEncoder(pickle.load(f), MAX_SEQ_LEN), source
+
+# Reload model/tokenizer function
+# Each worker process loads its own copy with TF_INTRA_OP_THREADS intra-op
+# threads; size WEB_CONCURRENCY * TF_INTRA_OP_THREADS to about the number of
+# physical cores so workers don't compete for the same ones
+def load_model_and_tokenizer():
+    stamp = read_model_stamp()
+    new_encoder, new_source = load_encoder()
+    new_predict_fn, apply = load_inference_backend()
+    if apply is None:
+        # Trigger tracing/XLA compilation for every batch bucket before the
+        # model goes live, so neither the first request after startup nor
+        # after a retrain pays for it (a reused Keras model is already traced)
+        for rows in WARMUP_BUCKETS:
+            new_predict_fn(np.zeros((rows, MAX_SEQ_LEN), dtype=np.int32))
+
+    def publish():
+        global model_state
+        if apply is not None:
+            apply()
+        # Cached predictions belong to the previous model. A fresh instance (rather
+        # than clear()) also discards results from batches still running on it.
+        model_state = ModelState(new_encoder, new_source, new_predict_fn, LRUCache(CLASSIFY_CACHE_SIZE), stamp)
+
+    # Every model call runs on the inference thread, so queuing the swap there
+    # lets in-flight batches finish on the old model and no batch sees a
+    # half-updated one
+    inference_executor.submit(publish).result()
     logger.info("Model and tokenizer reloaded successfully.")
 
+# Reload when the model stamp moved since the current model was loaded. Only
+# retrain_model.py and export_model.py write it, as the last step of a complete
+# update. Skipped while either holds the artifact lock; the next check retries.
+# classify.ipynb writes the artifacts without the stamp or the lock, so don't
+# run it against a live API's directory: its files are only picked up by a
+# restart or the next stamped update.
+reload_lock = threading.Lock()
+
+def reload_if_changed():
+    with reload_lock, artifact_lock(blocking=False) as acquired:
+        if not acquired or read_model_stamp() == model_state.stamp:
+            return
+        load_model_and_tokenizer()
+
+# Each gunicorn worker serves its own copy of the model, and only the worker
+# that ran a retrain is told when it finishes; the others notice the stamp here
+async def model_reload_watcher():
+    while True:
+        await asyncio.sleep(MODEL_POLL_SECONDS)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, reload_if_changed)
+        except Exception as e:
+            logger.error("Model reload failed: %s", e)
+
 # Initial load at startup
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
+    global classify_queue, batch_worker_task, reload_watcher_task
     load_model_and_tokenizer()
+    classify_queue = asyncio.Queue()
+    batch_worker_task = asyncio.create_task(classify_batch_worker())
+    reload_watcher_task = asyncio.create_task(model_reload_watcher())
 
 # Pydantic models
 class TextInput(BaseModel):
@@ -107,6 +417,12 @@ class TextInput(BaseModel):
 class SentenceInput(BaseModel):
     sentence: str
 
+class SentencesInput(BaseModel):
+    sentences: List[str]
+
+class BatchInput(BaseModel):
+    texts: List[str]
+
 class_labels = ["benign", "suspicious", "critical"]
 
 # Health-check endpoint
@@ -114,17 +430,78 @@ class_labels = ["benign", "suspicious", "critical"]
 def health():
     return {"status": "ok"}
 
-# Classification logic (can be reused internally)
-def classify_logic(text: str):
-    seq = tokenizer.texts_to_sequences([text])
-    padded = tf.keras.preprocessing.sequence.pad_sequences(seq, maxlen=MAX_SEQ_LEN, padding="post")
-    prediction = model.predict(padded)
-    idx = int(np.argmax(prediction, axis=1)[0])
-    return {
-        "input_text": text,
-        "predicted_class": class_labels[idx],
-        "confidence": float(np.max(prediction))
-    }
+# Cache key: a digest of the ids the model is fed (from encode_tail), so two
+# texts share a result exactly when the model cannot tell them apart. A fixed
+# 16-byte digest keeps memory bounded no matter how long the text is.
+def cache_key(ids):
+    return hashlib.blake2b(np.asarray(ids, dtype=np.int32).tobytes(), digest_size=16).digest()
+
+def cached_result(text: str, cache, key):
+    hit = cache.get(key)
+    if hit is None:
+        return None
+    return {"input_text": text, "predicted_class": hit[0], "confidence": hit[1]}
+
+# Batched classification logic: one tokenizer pass and one model call for
+# every text that is not already cached
+def classify_batch_logic(texts, pad_buf=None):
+    # Snapshot the model state once so a concurrent reload cannot mix old and new
+    state = model_state
+    cache, batch_encoder, batch_predict_fn = state.cache, state.encoder, state.predict_fn
+    ids = [batch_encoder.encode_tail(text) for text in texts]
+    keys = [cache_key(text_ids) for text_ids in ids]
+    results = [cached_result(text, cache, key) for text, key in zip(texts, keys)]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        padded = batch_encoder.ids_to_padded(
+            [ids[i] for i in misses], rows=batch_bucket(len(misses)), out=pad_buf
+        )
+        prediction = batch_predict_fn(padded)[:len(misses)]
+        # One reduction for the labels; confidences are gathered, not recomputed
+        idxs = prediction.argmax(axis=1)
+        confs = prediction[np.arange(len(idxs)), idxs]
+        for i, idx, conf in zip(misses, idxs.tolist(), confs.tolist()):
+            label, confidence = class_labels[idx], conf
+            cache.put(keys[i], (label, confidence))
+            results[i] = {"input_text": texts[i], "predicted_class": label, "confidence": confidence}
+    return results
+
+# Background consumer: waits up to MAX_BATCH_LATENCY_MS for concurrent
+# requests to join, then classifies up to MAX_BATCH_SIZE of them with a
+# single model call
+async def classify_batch_worker():
+    while True:
+        items = [await classify_queue.get()]
+        if MAX_BATCH_LATENCY > 0 and classify_queue.qsize() < MAX_BATCH_SIZE - 1:
+            await asyncio.sleep(MAX_BATCH_LATENCY)
+        try:
+            while len(items) < MAX_BATCH_SIZE:
+                items.append(classify_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            pass
+        try:
+            # Inference blocks, so run it off the event loop
+            results = await asyncio.get_running_loop().run_in_executor(
+                inference_executor, classify_batch_logic, [text for text, _ in items], batch_pad_buf
+            )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+# Cache hit, or a place in the next micro-batch
+async def classify_queued(text: str):
+    state = model_state
+    cached = cached_result(text, state.cache, cache_key(state.encoder.encode_tail(text)))
+    if cached is not None:
+        return cached
+    future = asyncio.get_running_loop().create_future()
+    await classify_queue.put((text, future))
+    return await future
 
 # Classification endpoint
 @app.post("/classify")
@@ -133,28 +510,83 @@ async def classify_text(data: TextInput):
     if not text:
         raise HTTPException(status_code=400, detail="Empty text provided.")
     try:
-        return classify_logic(text)
+        return await classify_queued(text)
     except Exception as e:
         logger.exception("Error during classification: %s", e)
         raise HTTPException(status_code=500, detail="Classification error.")
 
+# Classify a caller-supplied list in MAX_BATCH_SIZE chunks, so only the
+# warmed batch shapes ever reach the model
+def classify_many(texts):
+    results = []
+    for start in range(0, len(texts), MAX_BATCH_SIZE):
+        results.extend(classify_batch_logic(texts[start:start + MAX_BATCH_SIZE]))
+    return results
+
+# Batch classification endpoint: one request, one tokenizer pass and as few
+# model calls as possible for bulk callers
+@app.post("/classify_batch")
+async def classify_batch(data: BatchInput):
+    if len(data.texts) > MAX_ALLOWED_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ALLOWED_BATCH} texts per request.")
+    texts = [t.strip() for t in data.texts]
+    if not all(texts):
+        raise HTTPException(status_code=400, detail="Empty text provided.")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(inference_executor, classify_many, texts)
+    except Exception as e:
+        logger.exception("Error during batch classification: %s", e)
+        raise HTTPException(status_code=500, detail="Classification error.")
+
+# The extracted text is returned to the client as input_text and stored as
+# the message body, so every page is read with its line layout intact; only
+# the classifier truncates it (to the last MAX_SEQ_LEN tokens)
+def extract_pdf_text(pdf_doc):
+    return "".join(page.get_text() for page in pdf_doc).strip()
+
+# Blocking PDF parse
+def read_pdf_text(pdf_bytes: bytes):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+        return extract_pdf_text(pdf_doc)
+
 # PDF upload endpoint -> Extract text -> Classify
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
     try:
         pdf_bytes = await file.read()
-        pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        text = "".join([page.get_text() for page in pdf_doc]).strip()
+        text = await asyncio.get_running_loop().run_in_executor(None, read_pdf_text, pdf_bytes)
 
         if not text:
             raise HTTPException(status_code=400, detail="No text found in PDF.")
 
-        # Directly call classification logic without HTTP request
-        return classify_logic(text)
+        # Classify through the same micro-batcher as /classify
+        return await classify_queued(text)
     except Exception as e:
         logger.exception("Error processing PDF: %s", e)
         raise HTTPException(status_code=500, detail="PDF processing error.")
 
+# Statistical NER entities plus rule-based keyword hits for one parsed sentence
+def entities_from_doc(sentence: str, doc):
+    entities = []
+    
+    # Extract standard NER entities (with expanded categories)
+    for ent in doc.ents:
+        if ent.label_ in CATEGORIES:
+            entities.append((ent.text.strip(), ent.label_))
+    
+    # Extract weapon and military location/facility mentions
+    entities.extend(match_rules(sentence))
+    
+    # Remove duplicates while preserving order (dicts keep insertion order);
+    # entity texts are already stripped
+    unique = {}
+    for text, label in entities:
+        key = (text.lower(), label)
+        if key in unique or len(text) <= 1:  # Avoid single characters
+            continue
+        unique[key] = {"text": text, "label": label}
+    return list(unique.values())
+
 # NER & weapon extraction endpoint
 @app.post("/ner")
 def extract_entities(data: SentenceInput):
@@ -163,37 +595,11 @@ def extract_entities(data: SentenceInput):
         raise HTTPException(status_code=400, detail="Empty sentence provided.")
     
     try:
-        doc = nlp(sentence)
-        entities = []
-        
-        # Extract standard NER entities (with expanded categories)
-        for ent in doc.ents:
-            if ent.label_ in CATEGORIES:
-                entities.append((ent.text.strip(), ent.label_))
-        
-        # Extract weapon mentions
-        weapon_matches = matcher(doc)
-        for _, start, end in weapon_matches:
-            span = doc[start:end]
-            entities.append((span.text.strip(), "WEAPON"))
-        
-        # Extract military location/facility mentions
-        military_matches = military_matcher(doc)
-        for _, start, end in military_matches:
-            span = doc[start:end]
-            entities.append((span.text.strip(), "MILITARY"))
+        unique_entities = entities_from_doc(sentence, nlp(sentence))
         
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_entities = []
-        for text, label in entities:
-            key = (text.lower(), label)
-            if key not in seen and len(text.strip()) > 1:  # Avoid single characters
-                seen.add(key)
-                unique_entities.append({"text": text, "label": label})
-        
-        logger.info(f"Extracted {len(unique_entities)} entities from text: {sentence[:50]}...")
-        logger.info(f"Entities found: {unique_entities}")
+        logger.info("Extracted %d entities from text: %s...", len(unique_entities), sentence[:50])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Entities found: %s", unique_entities)
         
         return {"entities": unique_entities}
         
@@ -201,50 +607,151 @@ def extract_entities(data: SentenceInput):
         logger.exception("Error extracting entities: %s", e)
         raise HTTPException(status_code=500, detail=f"NER error: {str(e)}")
 
+# Batched NER: nlp.pipe runs the pipeline over all sentences in minibatches
+@app.post("/ner_batch")
+def extract_entities_batch(data: SentencesInput):
+    if len(data.sentences) > MAX_ALLOWED_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ALLOWED_BATCH} sentences per request.")
+    sentences = [s.strip() for s in data.sentences]
+    
+    try:
+        docs = nlp.pipe(sentences, batch_size=32)
+        results = [
+            {"entities": entities_from_doc(sentence, doc) if sentence else []}
+            for sentence, doc in zip(sentences, docs)
+        ]
+        logger.info("Extracted entities for %d sentences", len(results))
+        return {"results": results}
+        
+    except Exception as e:
+        logger.exception("Error extracting entities: %s", e)
+        raise HTTPException(status_code=500, detail=f"NER error: {str(e)}")
+
+# Shared PostgreSQL connection pool, opened on first use
+db_pool = None
+db_pool_lock = threading.Lock()
+# getconn() raises PoolError instead of waiting once all DB_POOL_MAX
+# connections are out, so callers queue here for a free slot first
+db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+def get_db_pool():
+    global db_pool
+    with db_pool_lock:
+        if db_pool is None:
+            db_pool = ThreadedConnectionPool(
+                minconn=1,
+                maxconn=DB_POOL_MAX,
+                host=os.environ.get("DB_HOST"),
+                port=os.environ.get("DB_PORT"),
+                dbname=os.environ.get("DB_NAME"),
+                user=os.environ.get("DB_USER"),
+                password=os.environ.get("DB_PASS"),
+            )
+        return db_pool
+
+def fetch_scalar(query: str, params=None):
+    pool = get_db_pool()
+    with db_pool_slots:
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                row = cur.fetchone()
+        except Exception:
+            pool.putconn(conn, close=True)
+            raise
+        # putconn rolls back the implicit read transaction before reuse
+        pool.putconn(conn)
+    return row[0] if row else None
+
+# model_metrics.json only changes after a retrain, so keep the parsed copy
+# until the file's mtime moves. Returns None when no metrics were written yet.
+metrics_cache = {"mtime": None, "metrics": None}
+
+def read_model_metrics():
+    try:
+        mtime = os.path.getmtime(METRICS_PATH)
+    except OSError:
+        return None
+    if metrics_cache["mtime"] != mtime:
+        with open(METRICS_PATH, "r") as f:
+            metrics_cache["metrics"] = json.load(f)
+        metrics_cache["mtime"] = mtime
+    return metrics_cache["metrics"]
+
+# Retraining runs in one long-lived worker process (retrain_worker.py), so
+# TensorFlow and the training stack are imported once rather than on every
+# retrain. It is a plain subprocess: multiprocessing's spawn would re-import
+# this module in the child. One thread drives it, one retrain at a time.
+RETRAIN_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrain_worker.py")
+retrain_worker = None
+retrain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+
+def run_retrain_job():
+    global retrain_worker
+    if retrain_worker is None or retrain_worker.poll() is not None:
+        retrain_worker = subprocess.Popen(
+            [sys.executable, RETRAIN_WORKER_PATH], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+    try:
+        retrain_worker.stdin.write("retrain\n")
+        retrain_worker.stdin.flush()
+        reply = retrain_worker.stdout.readline().strip()
+    except OSError:
+        reply = ""
+    if not reply:
+        # Worker died; the next retrain starts a fresh one
+        retrain_worker.kill()
+        retrain_worker = None
+        raise RuntimeError("retraining worker exited")
+    if reply != "ok":
+        raise RuntimeError("see the worker traceback in the log")
+
+def on_retrain_done(future):
+    try:
+        future.result()
+    except Exception as e:
+        logger.error("Retraining failed: %s", e)
+        return
+    logger.info("Retraining finished successfully.")
+    try:
+        reload_if_changed()
+    except Exception as e:
+        logger.error("Model reload failed: %s", e)
+
 # Retraining endpoint
 @app.post("/api/model/retrain")
 async def retrain_model(background_tasks: BackgroundTasks):
     def run_retrain():
         logger.info("Starting model retraining...")
-        result = subprocess.run(
-            ["python", "retrain_model.py"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            logger.info("Retraining finished successfully.")
-            load_model_and_tokenizer()
-        else:
-            logger.error("Retraining failed: %s", result.stderr)
+        future = retrain_executor.submit(run_retrain_job)
+        future.add_done_callback(on_retrain_done)
 
     background_tasks.add_task(run_retrain)
     accuracy = None
-    metrics_path = "model_metrics.json"
-    if os.path.exists(metrics_path):
-        try:
-            with open(metrics_path, "r") as f:
-                metrics = json.load(f)
-                accuracy = metrics.get("val_accuracy")
-        except Exception as e:
-            logger.error("Failed to read model metrics: %s", e)
+    try:
+        metrics = read_model_metrics()
+        if metrics is not None:
+            accuracy = metrics.get("val_accuracy")
+    except Exception as e:
+        logger.error("Failed to read model metrics: %s", e)
     return {"status": "retraining_started", "val_accuracy": accuracy}
 
 @app.get("/api/model/metrics")
 def get_model_metrics():
-    metrics_path = "model_metrics.json"
     metrics = {}
     trained_examples = 0
     new_db_examples = 0
     training = False
 
-    # Read metrics from file
-    if os.path.exists(metrics_path):
-        try:
-            with open(metrics_path, "r") as f:
-                metrics = json.load(f)
-                trained_examples = metrics.get("trained_examples", 1000)
-        except Exception as e:
-            logger.error("Failed to read model metrics: %s", e)
+    # Read metrics from file (cached until it changes)
+    try:
+        cached = read_model_metrics()
+        if cached is not None:
+            metrics = cached
+            trained_examples = metrics.get("trained_examples", 1000)
+    except Exception as e:
+        logger.error("Failed to read model metrics: %s", e)
     
     training_flag = "training.lock"
     if os.path.exists(training_flag):
@@ -252,18 +759,8 @@ def get_model_metrics():
 
     # Count new examples in DB (not yet used for training)
     try:
-        conn = psycopg2.connect(
-            host=os.environ.get("DB_HOST"),
-            port=os.environ.get("DB_PORT"),
-            dbname=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"),
-            password=os.environ.get("DB_PASS"),
-        )
         query = "SELECT COUNT(*) FROM classified_messages WHERE trained IS FALSE OR trained IS NULL;"
-        with conn.cursor() as cur:
-            cur.execute(query)
-            new_db_examples = cur.fetchone()[0]
-        conn.close()
+        new_db_examples = fetch_scalar(query) or 0
     except Exception as e:
         logger.error("Failed to count new DB examples: %s", e)
         new_db_examples = 0
@@ -276,6 +773,7 @@ def get_model_metrics():
     }
 
 # Run with: python app.py
+# (multi-worker: gunicorn -c gunicorn.conf.py app:app)
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("FASTAPI_PORT", 8000))
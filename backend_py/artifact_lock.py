@@ -0,0 +1,53 @@
+# artifact_lock.py
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RETRAIN_LOCK_PATH = os.environ.get("RETRAIN_LOCK", "retrain.lock")
+MODEL_STAMP_PATH = os.environ.get("MODEL_STAMP", "model.stamp")
+
+# Cross-process lock around the model artifacts: a retrain holds it
+# exclusively while it trains and writes them, API workers hold it shared while
+# they load them. Yields whether the lock was taken (always True when blocking).
+# flock is POSIX-only; without it (single-process development on Windows) the
+# lock is a no-op.
+@contextmanager
+def artifact_lock(exclusive=False, blocking=True):
+    if fcntl is None:
+        yield True
+        return
+    with open(RETRAIN_LOCK_PATH, "a") as lock_file:
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Generation stamp: written (atomically) as the last step of every complete
+# artifact update, while the exclusive lock is held. API workers reload only
+# when it changes, so files still being written by anything else (e.g. the
+# notebook mid-run) are never picked up on their own.
+def write_model_stamp():
+    tmp_path = MODEL_STAMP_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, MODEL_STAMP_PATH)
+
+def read_model_stamp():
+    try:
+        with open(MODEL_STAMP_PATH, "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
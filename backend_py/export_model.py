@@ -0,0 +1,61 @@
+# export_model.py
+import os
+import tensorflow as tf
+from artifact_lock import artifact_lock, write_model_stamp
+from tensorflow.keras.models import model_from_json
+
+# ====== CONFIG ======
+MODEL_JSON_PATH = os.environ.get("MODEL_JSON", "sentiment.json")
+MODEL_WEIGHTS_PATH = os.environ.get("MODEL_WEIGHTS", "sentiment.weights.h5")
+MODEL_TFLITE_PATH = os.environ.get("MODEL_TFLITE", "sentiment.tflite")
+MODEL_ONNX_PATH = os.environ.get("MODEL_ONNX", "sentiment.onnx")
+MODEL_ONNX_INT8_PATH = os.environ.get("MODEL_ONNX_INT8", "sentiment.int8.onnx")
+MAX_SEQ_LEN = int(os.environ.get("MAX_SEQ_LEN", 100))
+
+# ====== LOAD KERAS MODEL ======
+def load_keras_model():
+    with open(MODEL_JSON_PATH, "r") as jf:
+        model = model_from_json(jf.read())
+    model.load_weights(MODEL_WEIGHTS_PATH)
+    return model
+
+# ====== EXPORT TFLITE ======
+# Dynamic-range quantization: int8 weights, float activations. On x86 this is
+# faster than full-int8 for the embedding/LSTM stack.
+def export_tflite(model):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS,
+        tf.lite.OpsSet.SELECT_TF_OPS,
+    ]
+    with open(MODEL_TFLITE_PATH, "wb") as f:
+        f.write(converter.convert())
+    print(f"[INFO] TFLite model written to {MODEL_TFLITE_PATH}")
+
+# ====== EXPORT ONNX ======
+# int32 token ids in, class probabilities out; served by onnxruntime in app.py
+def export_onnx(model):
+    import tf2onnx
+    spec = [tf.TensorSpec((None, MAX_SEQ_LEN), tf.int32, name="input")]
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=17, output_path=MODEL_ONNX_PATH)
+    print(f"[INFO] ONNX model written to {MODEL_ONNX_PATH}")
+
+# ====== QUANTIZE ONNX ======
+# Dynamic int8 weight quantization of the ONNX export; MatMulInteger kernels
+# use VNNI where the CPU has it. Takes the model for symmetry with the other
+# exporters but reads the float ONNX file written by export_onnx().
+def export_onnx_int8(model=None):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(MODEL_ONNX_PATH, MODEL_ONNX_INT8_PATH, weight_type=QuantType.QInt8)
+    print(f"[INFO] int8 ONNX model written to {MODEL_ONNX_INT8_PATH}")
+
+if __name__ == "__main__":
+    # Exports are rewritten in place, so hold the lock like a retrain does and
+    # only stamp the new generation once all three are complete
+    with artifact_lock(exclusive=True):
+        model = load_keras_model()
+        export_tflite(model)
+        export_onnx(model)
+        export_onnx_int8(model)
+        write_model_stamp()
@@ -0,0 +1,19 @@
+# gunicorn.conf.py
+# Run with: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('FASTAPI_PORT', 8000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import app.py once in the master before forking, so the spaCy pipeline and
+# keyword automaton are shared copy-on-write instead of loaded per worker.
+# The classifier itself is still loaded in each worker's startup event: the
+# TensorFlow runtime's thread pools do not survive a fork.
+preload_app = True
+
+# Retraining is safe with several workers: retrains hold an exclusive lock on
+# RETRAIN_LOCK (see artifact_lock.py), so they run one at a time, and every
+# worker reloads within MODEL_POLL_SECONDS once a retrain (or export_model.py)
+# writes MODEL_STAMP as its last step. classify.ipynb writes the artifacts
+# without the lock or the stamp: don't run it against a live API's directory.
@@ -1,25 +1,52 @@
 # retrain_model.py
+import io
+import gzip
 import os
 import json
-import pickle
 import psycopg2
 import pandas as pd
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import numpy as np
+import tensorflow as tf
 from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 from tensorflow.keras.models import Sequential, model_from_json
-from tensorflow.keras.layers import Embedding, LSTM, Dense, SpatialDropout1D
+from tensorflow.keras.layers import Embedding, LSTM, Dense, Dropout, SpatialDropout1D
 from tensorflow.keras.utils import to_categorical
 from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed
+from text_encoding import SequenceEncoder
+from artifact_lock import artifact_lock, write_model_stamp
+from export_model import (
+    export_tflite, export_onnx, export_onnx_int8,
+    MODEL_TFLITE_PATH, MODEL_ONNX_PATH, MODEL_ONNX_INT8_PATH,
+)
 
 # ====== CONFIG ======
 CSV_DATA_PATH = "classification_dataset.csv"
+# pandas' default NA strings: the Arrow reader must treat them as missing too,
+# so merge_datasets' dropna removes the same rows pd.read_csv used to
+CSV_NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+# Columnar copy of the CSV, rebuilt whenever the CSV changes
+PARQUET_DATA_PATH = os.path.splitext(CSV_DATA_PATH)[0] + ".parquet"
 MODEL_JSON_PATH = os.environ.get("MODEL_JSON", "sentiment.json")
 MODEL_WEIGHTS_PATH = os.environ.get("MODEL_WEIGHTS", "sentiment.weights.h5")
-TOKENIZER_PATH = os.environ.get("TOKENIZER", "tokenizer.pkl")
+TOKENIZER_JSON_PATH = os.environ.get("TOKENIZER_JSON", "tokenizer.json.gz")
+VOCAB_PATH = os.environ.get("VOCAB", "vocab.npz")
 MAX_SEQ_LEN = int(os.environ.get("MAX_SEQ_LEN", 100))
 MAX_NUM_WORDS = 10000
 EMBEDDING_DIM = 100
+EPOCHS = 5
+BATCH_SIZE = 32
+RANDOM_STATE = 42
+# Corpora at least this large are encoded in parallel shards; below it the
+# worker start-up costs more than it saves
+PARALLEL_ENCODE_MIN = int(os.environ.get("PARALLEL_ENCODE_MIN", 200000))
+# Train in mixed_float16: "auto" (only when a GPU is visible), "1" or "0"
+MIXED_PRECISION = os.environ.get("MIXED_PRECISION", "auto")
 
 # DB Connection from environment variables
 DB_HOST = os.environ.get("DB_HOST")
@@ -41,13 +68,22 @@ def fetch_db_data():
             user=DB_USER,
             password=DB_PASS
         )
+        # COPY streams the rows as CSV straight into pandas' C parser instead
+        # of building a Python tuple per row through the DBAPI. A bytes buffer
+        # skips psycopg2's decode into str; the parser decodes UTF-8 itself.
         query = """
-            SELECT text, classification
-            FROM classified_messages
-            WHERE classification IN ('benign', 'suspicious', 'critical')
+            COPY (
+                SELECT text, classification
+                FROM classified_messages
+                WHERE classification IN ('benign', 'suspicious', 'critical')
+            ) TO STDOUT WITH CSV HEADER
         """
-        df = pd.read_sql(query, conn)
+        buf = io.BytesIO()
+        with conn.cursor() as cur:
+            cur.copy_expert(query, buf)
         conn.close()
+        buf.seek(0)
+        df = pd.read_csv(buf, encoding="utf-8", dtype={"text": str, "classification": "category"})
         print(f"Retrieved {len(df)} messages from DB")
         return df
     except Exception as e:
@@ -55,11 +91,55 @@ def fetch_db_data():
         return pd.DataFrame(columns=["text", "classification"])
 
 # ====== LOAD CSV DATA ======
+# The Parquet copy is tagged with the size and mtime of the CSV it was built
+# from, so any replaced or edited CSV (even one with an older mtime) misses
+def csv_cache_key():
+    st = os.stat(CSV_DATA_PATH)
+    # The leading version invalidates copies parsed without CSV_NULL_VALUES
+    return f"2:{st.st_size}:{st.st_mtime_ns}".encode("utf-8")
+
+def read_parquet_copy(key):
+    try:
+        metadata = pq.read_schema(PARQUET_DATA_PATH).metadata or {}
+        if metadata.get(b"source_csv") == key:
+            return pq.read_table(PARQUET_DATA_PATH)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print("[WARN] Ignoring unreadable Parquet copy of the CSV dataset:", e)
+    return None
+
+# Written to a temporary file and renamed into place, so a crash mid-write
+# never leaves a truncated copy behind
+def write_parquet_copy(table, key):
+    tmp_path = PARQUET_DATA_PATH + ".tmp"
+    try:
+        metadata = dict(table.schema.metadata or {}, source_csv=key)
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path, compression="snappy")
+        os.replace(tmp_path, PARQUET_DATA_PATH)
+    except Exception as e:
+        print("[WARN] Could not write Parquet copy of the CSV dataset:", e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def load_csv_data():
     if os.path.exists(CSV_DATA_PATH):
-        df = pd.read_csv(CSV_DATA_PATH)
-        if "label" in df.columns:
-            df = df.rename(columns={"label": "classification"})
+        # The CSV stays the editable source; the Parquet copy skips CSV parsing
+        # on every retrain until the CSV changes
+        key = csv_cache_key()
+        table = read_parquet_copy(key)
+        if table is None:
+            # Arrow's multi-threaded C++ reader
+            table = pacsv.read_csv(
+                CSV_DATA_PATH,
+                read_options=pacsv.ReadOptions(use_threads=True),
+                convert_options=pacsv.ConvertOptions(null_values=CSV_NULL_VALUES, strings_can_be_null=True),
+            )
+            if "label" in table.column_names:
+                table = table.rename_columns(["classification" if c == "label" else c for c in table.column_names])
+            write_parquet_copy(table, key)
+        # Handed to pandas without an extra copy
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
         print(f"Loaded {len(df)} samples from CSV")
         return df
     else:
@@ -69,28 +149,68 @@ def load_csv_data():
 # ====== MERGE DATASETS ======
 def merge_datasets(db_df, csv_df):
     merged = pd.concat([csv_df, db_df], ignore_index=True)
-    merged.drop_duplicates(subset=["text"], inplace=True)
     merged.dropna(subset=["text", "classification"], inplace=True)
+    # Dedupe on 64-bit text hashes (vectorized in C), keeping each text's
+    # first occurrence in its original position
+    hashes = pd.util.hash_array(merged["text"].astype(str).to_numpy())
+    _, first = np.unique(hashes, return_index=True)
+    merged = merged.iloc[np.sort(first)]
+    # Unknown labels would otherwise be encoded as category -1
+    merged = merged[merged["classification"].isin(list(LABELS))]
     print(f"Final merged dataset size: {len(merged)}")
     return merged
 
 # ====== PREPROCESS ======
 def preprocess_data(df):
     tokenizer = Tokenizer(num_words=MAX_NUM_WORDS, lower=True, oov_token="<OOV>")
-    tokenizer.fit_on_texts(df["text"].astype(str))
-    sequences = tokenizer.texts_to_sequences(df["text"].astype(str))
-    padded = pad_sequences(sequences, maxlen=MAX_SEQ_LEN, padding="post")
-    labels = df["classification"].map(LABELS).values
+    texts = df["text"].astype(str).tolist()
+    tokenizer.fit_on_texts(texts)
+    encoder = SequenceEncoder(tokenizer, MAX_SEQ_LEN)
+    if len(texts) >= PARALLEL_ENCODE_MIN:
+        # One contiguous shard per core; encoding is pure Python, so processes
+        # rather than threads
+        step = -(-len(texts) // (os.cpu_count() or 1))
+        shards = Parallel(n_jobs=-1, prefer="processes")(
+            delayed(encoder.texts_to_padded)(texts[i:i + step]) for i in range(0, len(texts), step)
+        )
+        padded = np.concatenate(shards)
+    else:
+        padded = encoder.texts_to_padded(texts)
+    # Categorical codes follow LABELS order, so this matches the old LABELS dict lookup
+    labels = pd.Categorical(df["classification"], categories=list(LABELS)).codes.astype(np.int32)
     y = to_categorical(labels, num_classes=3)
     return padded, y, tokenizer
 
 # ====== BUILD MODEL ======
-def build_model(input_length):
+def use_mixed_precision():
+    if MIXED_PRECISION == "auto":
+        return bool(tf.config.list_physical_devices("GPU"))
+    return MIXED_PRECISION == "1"
+
+def build_model(input_length, mixed_precision=False):
+    # The policy is process-wide and the API reuses its retrain worker, so
+    # set it explicitly on every build
+    tf.keras.mixed_precision.set_global_policy("mixed_float16" if mixed_precision else "float32")
     model = Sequential()
     model.add(Embedding(MAX_NUM_WORDS, EMBEDDING_DIM, input_length=input_length))
     model.add(SpatialDropout1D(0.2))
-    model.add(LSTM(128, dropout=0.2, recurrent_dropout=0.2))
-    model.add(Dense(3, activation="softmax"))
+    # No recurrent_dropout: it forces the generic LSTM loop, while this
+    # configuration runs on the fused cuDNN (GPU) / oneDNN (CPU) kernels.
+    # The recurrent regularization moves to a Dropout on the LSTM output.
+    # The kernel requirements are spelled out so a later edit can't silently
+    # fall off the fused path.
+    model.add(LSTM(
+        128,
+        activation="tanh",
+        recurrent_activation="sigmoid",
+        dropout=0.2,
+        recurrent_dropout=0.0,
+        unroll=False,
+        use_bias=True,
+    ))
+    model.add(Dropout(0.2))
+    # Softmax/loss stay in float32 for numerical stability under mixed precision
+    model.add(Dense(3, activation="softmax", dtype="float32"))
     model.compile(loss="categorical_crossentropy", optimizer="adam", metrics=["accuracy"])
     return model
 
@@ -112,6 +232,15 @@ def mark_db_examples_as_trained(ids):
 
 # ====== MAIN TRAINING ======
 def main():
+    # Retrains started from different API workers (or by hand) run one at a
+    # time, and API workers don't load the artifacts while they are rewritten
+    with artifact_lock(exclusive=True):
+        if train():
+            # Last step: tells the API workers a complete new model is in place
+            write_model_stamp()
+
+# Returns True once a new model and its artifacts have been written
+def train():
     # 1. Fetch data
     db_data = fetch_db_data()
     if not db_data.empty and "id" in db_data.columns:
@@ -125,25 +254,66 @@ def main():
 
     # 2. Preprocess
     X, y, tokenizer = preprocess_data(merged_data)
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.1, random_state=42)
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.1, random_state=RANDOM_STATE)
+    # Cache the converted tensors once, reshuffle them each epoch and prepare
+    # the next batches while the current step runs
+    train_ds = (
+        tf.data.Dataset.from_tensor_slices((X_train, y_train))
+        .cache()
+        .shuffle(len(X_train), seed=RANDOM_STATE, reshuffle_each_iteration=True)
+        .batch(BATCH_SIZE)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    val_ds = (
+        tf.data.Dataset.from_tensor_slices((X_val, y_val))
+        .batch(BATCH_SIZE)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
 
     # 3. Build and train model
-    model = build_model(input_length=MAX_SEQ_LEN)
-    print("[INFO] Starting training...")
-    model.fit(X_train, y_train, epochs=5, batch_size=32, validation_data=(X_val, y_val), verbose=1)
-    val_loss, val_acc = model.evaluate(X_val, y_val, verbose=0)
+    mixed_precision = use_mixed_precision()
+    model = build_model(input_length=MAX_SEQ_LEN, mixed_precision=mixed_precision)
+    print(f"[INFO] Starting training (GPUs available: {len(tf.config.list_physical_devices('GPU'))}, mixed precision: {mixed_precision})...")
+    model.fit(train_ds, epochs=EPOCHS, validation_data=val_ds, verbose=1)
+    val_loss, val_acc = model.evaluate(val_ds, verbose=0)
     metrics = {"val_accuracy": float(val_acc)}
     with open("model_metrics.json", "w") as f:
         json.dump(metrics, f)
+    if mixed_precision:
+        # The API and the exporters run on CPU, where float16 math is slow;
+        # save a float32 copy (the trained variables are float32 already)
+        trained = model
+        model = build_model(input_length=MAX_SEQ_LEN)
+        model.build((None, MAX_SEQ_LEN))
+        model.set_weights(trained.get_weights())
     # 4. Save model & tokenizer
     model_json = model.to_json()
     with open(MODEL_JSON_PATH, "w") as json_file:
         json_file.write(model_json)
     model.save_weights(MODEL_WEIGHTS_PATH)
-    with open(TOKENIZER_PATH, "wb") as tok_file:
-        pickle.dump(tokenizer, tok_file)
+    # Keras' JSON form (read back with tokenizer_from_json): smaller and
+    # faster to write than pickling the Tokenizer object, and safe to load
+    with gzip.open(TOKENIZER_JSON_PATH, "wt", encoding="utf-8", compresslevel=3) as tok_file:
+        tok_file.write(tokenizer.to_json())
+    # The API loads this compact vocabulary instead of the full tokenizer
+    SequenceEncoder(tokenizer, MAX_SEQ_LEN).save_vocab(VOCAB_PATH)
 
     print("[INFO] Model & tokenizer saved successfully.")
 
+    # 5. Refresh the exported models so the API never serves stale weights
+    for name, export, path in [
+        ("TFLite", export_tflite, MODEL_TFLITE_PATH),
+        ("ONNX", export_onnx, MODEL_ONNX_PATH),
+        ("int8 ONNX", export_onnx_int8, MODEL_ONNX_INT8_PATH),
+    ]:
+        try:
+            export(model)
+        except Exception as e:
+            print(f"[WARN] {name} export failed, API will fall back to another backend:", e)
+            if os.path.exists(path):
+                os.remove(path)
+    return True
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
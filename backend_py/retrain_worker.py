@@ -0,0 +1,46 @@
+# retrain_worker.py
+# Long-lived retraining process started by app.py. It runs as its own script
+# rather than through multiprocessing, so it imports only the training stack
+# and never re-runs app.py (spaCy pipeline, keyword automaton, FastAPI app).
+import os
+import sys
+
+# app.py sizes TensorFlow for small inference batches through these variables,
+# and this process inherits them. Drop them before TensorFlow is imported so
+# training runs with TF's default thread pools and without forced XLA
+# auto-clustering.
+INFERENCE_ENV_VARS = (
+    "TF_INTRA_OP_THREADS",
+    "TF_INTER_OP_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+    "OMP_NUM_THREADS",
+    "TF_JIT_COMPILE",
+    "TF_XLA_FLAGS",
+)
+for name in INFERENCE_ENV_VARS:
+    os.environ.pop(name, None)
+
+import traceback
+import retrain_model
+
+# One "retrain" line on stdin runs one retrain and answers "ok" or "failed".
+# Replies go out on the original stdout; everything the training code prints
+# is sent to stderr, which is shared with the API's log.
+def serve():
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout.reconfigure(line_buffering=True)
+    for line in sys.stdin:
+        if line.strip() != "retrain":
+            continue
+        try:
+            retrain_model.main()
+        except Exception:
+            traceback.print_exc()
+            replies.write("failed\n")
+        else:
+            replies.write("ok\n")
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,81 @@
+# text_encoding.py
+import numpy as np
+
+# Plain NumPy equivalent of Keras Tokenizer.texts_to_sequences + pad_sequences
+# (padding="post", default truncating="pre") without the intermediate lists.
+# Shared by the API and retraining so both encode text identically.
+class SequenceEncoder:
+    def __init__(self, tok, max_len):
+        oov_index = tok.word_index.get(tok.oov_token)
+        # Apply the num_words cut-off up front so each token is a single
+        # dict.get: words past it are simply left out, which encodes them as
+        # OOV (or drops them when there is no OOV token), as Keras does
+        num_words = tok.num_words
+        vocab = {w: i for w, i in tok.word_index.items() if not num_words or i < num_words}
+        self._setup(vocab, oov_index, tok.lower, tok.split, tok.filters, max_len)
+
+    def _setup(self, vocab, oov_index, lower, split, filters, max_len):
+        self.vocab = vocab
+        self.oov_index = oov_index
+        self.lower = lower
+        self.split = split
+        self.filters = filters
+        self.filter_table = str.maketrans({c: split for c in filters})
+        self.max_len = max_len
+
+    # The cut-off vocab plus the text options is all encoding needs, so save
+    # just that as flat arrays instead of the whole Tokenizer (with its
+    # word_counts/word_docs/index_word dicts). The words are stored as one
+    # UTF-8 blob plus per-word lengths, not as a fixed-width string array.
+    def save_vocab(self, path):
+        words = list(self.vocab.keys())
+        np.savez_compressed(
+            path,
+            words=np.frombuffer("".join(words).encode("utf-8"), dtype=np.uint8),
+            word_lengths=np.array([len(w) for w in words], dtype=np.int32),
+            ids=np.array(list(self.vocab.values()), dtype=np.int32),
+            oov_index=np.int32(-1 if self.oov_index is None else self.oov_index),
+            options=np.array([self.filters, self.split, str(int(self.lower))]),
+        )
+
+    @classmethod
+    def from_vocab(cls, path, max_len):
+        with np.load(path, allow_pickle=False) as data:
+            blob = data["words"].tobytes().decode("utf-8")
+            ends = np.cumsum(data["word_lengths"]).tolist()
+            words = [blob[start:end] for start, end in zip([0] + ends, ends)]
+            vocab = dict(zip(words, data["ids"].tolist()))
+            oov_index = int(data["oov_index"])
+            filters, split, lower = data["options"].tolist()
+        encoder = cls.__new__(cls)
+        encoder._setup(vocab, None if oov_index < 0 else oov_index, lower == "1", split, filters, max_len)
+        return encoder
+
+    def encode(self, text: str):
+        if self.lower:
+            text = text.lower()
+        words = text.translate(self.filter_table).split(self.split)
+        vocab = self.vocab
+        if self.oov_index is None:
+            return [vocab[w] for w in words if w in vocab]
+        get, oov = vocab.get, self.oov_index
+        return [get(w, oov) for w in words if w]
+
+    # The ids the model actually sees for a text (truncating="pre")
+    def encode_tail(self, text: str):
+        return self.encode(text)[-self.max_len:]
+
+    # `out` lets a caller reuse one preallocated int32 buffer across calls
+    def texts_to_padded(self, texts, rows=None, out=None):
+        return self.ids_to_padded((self.encode_tail(text) for text in texts), rows or len(texts), out)
+
+    # Same, for id lists already cut down by encode_tail
+    def ids_to_padded(self, id_lists, rows, out=None):
+        if out is None:
+            buf = np.zeros((rows, self.max_len), dtype=np.int32)
+        else:
+            buf = out[:rows]
+            buf.fill(0)
+        for row, ids in enumerate(id_lists):
+            buf[row, :len(ids)] = ids
+        return buf